@@ -8,7 +8,7 @@
 
 use image::ImageReader;
 use mac_client::app::{AppState, BackgroundCommand, UiEvent};
-use mac_client::pty::{PtyCommand, PtyEvent, PtyManager};
+use mac_client::pty::{PtyCommand, PtyEvent, PtyManager, SOCKET_PATH};
 use mac_client::relay::{RelayClient, RelayCommand, RelayEvent};
 use muda::{CheckMenuItem, Menu, MenuEvent, MenuItem, PredefinedMenuItem};
 use smappservice_rs::{AppService, ServiceStatus, ServiceType};
@@ -18,7 +18,7 @@ use std::sync::atomic::{AtomicU32, Ordering};
 use std::sync::{mpsc, Arc};
 use std::thread;
 use std::time::{Duration, Instant};
-use tokio::runtime::Runtime;
+use tokio::runtime;
 use tray_icon::{TrayIcon, TrayIconBuilder};
 use tracing::{debug, error, info, warn};
 use winit::application::ApplicationHandler;
@@ -137,6 +137,8 @@ impl App {
                     info!("Killing relay-server (pid {})", relay_pid);
                     unsafe { libc::kill(relay_pid as i32, libc::SIGTERM); }
                 }
+                // process::exit skips PtyManager's Drop, so remove the socket here
+                let _ = std::fs::remove_file(SOCKET_PATH);
                 std::process::exit(0);
             }
             _ => {
@@ -357,10 +359,15 @@ fn main() {
     let cloudflared_pid = Arc::new(AtomicU32::new(0));
 
     // Install signal handler so relay-server and cloudflared are killed
-    // even if mac-client is terminated via SIGTERM/SIGINT (e.g. launchctl stop)
+    // even if mac-client is terminated via SIGTERM/SIGINT (e.g. launchctl stop).
+    // The PTY socket is unlinked too, since _exit skips PtyManager's Drop and
+    // would otherwise leave it for the next launch to clean up.
     {
         let relay_pid = relay_server_pid.clone();
         let cf_pid = cloudflared_pid.clone();
+        // Allocated up front: the handler must not allocate
+        let socket_path =
+            std::ffi::CString::new(SOCKET_PATH).expect("socket path contains NUL");
         unsafe {
             let cleanup = move || {
                 let rpid = relay_pid.load(Ordering::Relaxed);
@@ -371,6 +378,7 @@ fn main() {
                 if cpid != 0 {
                     libc::kill(cpid as i32, libc::SIGTERM);
                 }
+                libc::unlink(socket_path.as_ptr());
                 libc::_exit(0);
             };
             // Store in a static so the closure lives forever
@@ -548,7 +556,13 @@ fn run_background_tasks(
 ) {
     info!("Background thread starting");
 
-    let rt = Runtime::new().expect("Failed to create Tokio runtime");
+    // Everything on this thread is socket I/O (pty-proxy Unix sockets and the
+    // relay WebSocket), so a single-threaded reactor avoids cross-thread
+    // wakeups on the output path. Blocking work still goes to spawn_blocking.
+    let rt = runtime::Builder::new_current_thread()
+        .enable_all()
+        .build()
+        .expect("Failed to create Tokio runtime");
 
     rt.block_on(async {
         // Get relay URL from env or default
@@ -583,9 +597,12 @@ fn run_background_tasks(
         // Clone for relay forwarding (before move)
         let pty_cmd_tx_for_relay = pty_internal_cmd_tx.clone();
 
+        // All long-running tasks live in one set so shutdown cancels them together
+        let mut tasks = tokio::task::JoinSet::new();
+
         // Forward pty commands from main thread to pty manager
         let mut pty_cmd_rx = pty_cmd_rx;
-        let pty_forward_handle = tokio::spawn(async move {
+        tasks.spawn(async move {
             while let Some(cmd) = pty_cmd_rx.recv().await {
                 if pty_internal_cmd_tx.send(cmd).is_err() {
                     break;
@@ -596,13 +613,13 @@ fn run_background_tasks(
         // Spawn cloudflared tunnel
         let ui_tx_tunnel = ui_tx.clone();
         let cloudflared_pid = cloudflared_pid.clone();
-        let tunnel_handle = tokio::task::spawn_blocking(move || {
+        tasks.spawn_blocking(move || {
             run_cloudflared_tunnel(ui_tx_tunnel, cloudflared_pid);
         });
 
         // Forward PTY events to relay (output -> browser)
         let ui_tx_pty = ui_tx.clone();
-        let pty_event_handle = tokio::spawn(async move {
+        tasks.spawn(async move {
             while let Some(event) = pty_event_rx.recv().await {
                 match event {
                     PtyEvent::Attached { session_id, session_name } => {
@@ -660,13 +677,13 @@ fn run_background_tasks(
         });
 
         // Spawn relay client task
-        let relay_handle = tokio::spawn(async move {
+        tasks.spawn(async move {
             relay.run().await;
         });
 
         // Spawn event forwarding task
         let ui_tx_relay = ui_tx.clone();
-        let relay_forward_handle = tokio::task::spawn_blocking(move || {
+        tasks.spawn_blocking(move || {
             forward_relay_events(
                 relay_event_rx,
                 ui_tx_relay,
@@ -707,11 +724,7 @@ fn run_background_tasks(
         }
 
         // Abort tasks (they run forever, so we need to abort them)
-        relay_handle.abort();
-        relay_forward_handle.abort();
-        pty_forward_handle.abort();
-        pty_event_handle.abort();
-        tunnel_handle.abort();
+        tasks.abort_all();
 
         info!("Background tasks shut down");
     });
@@ -768,27 +781,31 @@ fn forward_relay_events(
                     }
                     RelayEvent::CreateSession => {
                         info!("Creating new terminal session");
-                        match std::process::Command::new("osascript")
-                            .arg("-e")
-                            .arg(r#"tell application "Terminal" to do script ""
+                        // Run osascript on its own blocking task so browser
+                        // input keeps flowing while Terminal opens the window
+                        tokio::task::spawn_blocking(|| {
+                            match std::process::Command::new("osascript")
+                                .arg("-e")
+                                .arg(r#"tell application "Terminal" to do script ""
 "#)
-                            .output()
-                        {
-                            Ok(output) => {
-                                if output.status.success() {
-                                    info!("New terminal window created");
-                                } else {
-                                    error!(
-                                        "osascript create failed ({}): {}",
-                                        output.status,
-                                        String::from_utf8_lossy(&output.stderr)
-                                    );
+                                .output()
+                            {
+                                Ok(output) => {
+                                    if output.status.success() {
+                                        info!("New terminal window created");
+                                    } else {
+                                        error!(
+                                            "osascript create failed ({}): {}",
+                                            output.status,
+                                            String::from_utf8_lossy(&output.stderr)
+                                        );
+                                    }
+                                }
+                                Err(e) => {
+                                    error!("Failed to run osascript for create: {}", e);
                                 }
                             }
-                            Err(e) => {
-                                error!("Failed to run osascript for create: {}", e);
-                            }
-                        }
+                        });
                         continue;
                     }
                 };
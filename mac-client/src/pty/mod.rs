@@ -9,11 +9,14 @@
 //!   - Resize notifications
 //!
 //! We forward output to relay (-> browser) and inject browser input back.
+//! Proxies that register with proxy_version >= 2 accept browser input as a
+//! raw 'I'-tagged frame; older proxies get the JSON input message.
 
-use serde::Deserialize;
+use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
+use std::os::fd::AsRawFd;
 use std::sync::Arc;
-use tokio::io::{AsyncReadExt, AsyncWriteExt};
+use tokio::io::{AsyncBufReadExt, AsyncReadExt, AsyncWriteExt, BufReader};
 use tokio::net::{UnixListener, UnixStream};
 use tokio::sync::{mpsc, Mutex};
 use tracing::{debug, error, info, warn};
@@ -21,6 +24,28 @@ use tracing::{debug, error, info, warn};
 /// Socket path for pty-proxy connections.
 pub const SOCKET_PATH: &str = "/tmp/terminal-remote.sock";
 
+/// First pty-proxy protocol version that accepts raw 'I'-tagged input frames.
+const PROXY_VERSION_BINARY_INPUT: u8 = 2;
+
+/// Read buffer size for each pty-proxy connection.
+const PROXY_READ_BUF_SIZE: usize = 256 * 1024;
+
+/// Kernel send/receive buffer size requested for pty-proxy sockets.
+const SOCKET_BUF_SIZE: libc::c_int = 1 << 20;
+
+/// Upper bound on output bytes coalesced into a single PtyEvent::Output.
+/// Keeps latency bounded during large bursts.
+const MAX_OUTPUT_BATCH: usize = 256 * 1024;
+
+/// Upper bound on browser input bytes folded into a single frame to pty-proxy.
+const MAX_INPUT_BATCH: usize = 64 * 1024;
+
+/// How long a detached session's TTY mapping is kept for late close requests.
+const TTY_MAP_GRACE: std::time::Duration = std::time::Duration::from_secs(60);
+
+/// Buffered read half of a pty-proxy connection.
+type ProxyReader = BufReader<tokio::net::unix::OwnedReadHalf>;
+
 /// Information about a connected pty-proxy session.
 #[derive(Debug, Clone)]
 pub struct PtySessionInfo {
@@ -80,8 +105,43 @@ struct Registration {
     shell: String,
     pid: u32,
     tty: String,
+    /// Absent in registrations from pre-versioned proxies.
+    #[serde(default = "default_proxy_version")]
+    proxy_version: u8,
+}
+
+fn default_proxy_version() -> u8 {
+    1
+}
+
+impl Registration {
+    /// Whether the proxy accepts raw 'I'-tagged input frames.
+    fn binary_input(&self) -> bool {
+        self.proxy_version >= PROXY_VERSION_BINARY_INPUT
+    }
 }
 
+/// JSON control message from pty-proxy ('{'-tagged frame).
+#[derive(Debug, Deserialize)]
+#[serde(tag = "type", rename_all = "snake_case")]
+enum ProxyControl {
+    /// Terminal resized on the mac side (SIGWINCH).
+    Resize { cols: u16, rows: u16 },
+}
+
+/// JSON input message for proxies without raw input frame support.
+/// `type` is serialized first so the proxy's tagged-enum decode does not
+/// have to buffer `data` before it knows the variant.
+#[derive(Serialize)]
+struct InputMessage<'a> {
+    #[serde(rename = "type")]
+    kind: &'static str,
+    data: &'a [u8],
+}
+
+/// Close request sent to pty-proxy.
+const CLOSE_MESSAGE: &[u8] = br#"{"type":"close"}"#;
+
 /// Manages pty-proxy connections.
 /// Exists to own the Drop impl that cleans up the socket file.
 pub struct PtyManager;
@@ -90,12 +150,44 @@ pub struct PtyManager;
 struct SessionHandle {
     info: PtySessionInfo,
     writer: tokio::net::unix::OwnedWriteHalf,
+    /// Whether the proxy accepts raw 'I'-tagged input frames.
+    binary_input: bool,
+}
+
+/// TTY of a session, plus whether a window close is already in flight.
+struct TtyEntry {
+    tty: String,
+    closing: bool,
+}
+
+/// What a kill request should do about the session's Terminal.app window.
+#[derive(Debug, PartialEq)]
+enum WindowClose {
+    /// Close the window on this TTY.
+    Close(String),
+    /// A close for this session is already running; do nothing.
+    AlreadyClosing,
+    /// No TTY known; ask pty-proxy to close instead.
+    NoTty,
 }
 
-/// Shared TTY map: session_id -> tty path.
-/// Persists after session disconnect so late close_session commands can still
-/// find the TTY to close the Terminal.app window.
-type TtyMap = Arc<Mutex<HashMap<String, String>>>;
+/// Decide how to close a session's window, marking it as closing when a
+/// close is started.
+fn begin_window_close(tty_map: &mut HashMap<String, TtyEntry>, session_id: &str) -> WindowClose {
+    match tty_map.get_mut(session_id) {
+        Some(entry) if entry.closing => WindowClose::AlreadyClosing,
+        Some(entry) => {
+            entry.closing = true;
+            WindowClose::Close(entry.tty.clone())
+        }
+        None => WindowClose::NoTty,
+    }
+}
+
+/// Shared TTY map: session_id -> tty entry.
+/// Persists for TTY_MAP_GRACE after session disconnect so late close_session
+/// commands can still find the TTY to close the Terminal.app window.
+type TtyMap = Arc<Mutex<HashMap<String, TtyEntry>>>;
 
 impl PtyManager {
     /// Create a new PtyManager.
@@ -178,7 +270,10 @@ async fn handle_proxy_connection(
     tty_map: TtyMap,
 ) -> Result<(), Box<dyn std::error::Error + Send + Sync>> {
     let session_id = uuid::Uuid::new_v4().to_string();
-    let (mut reader, writer) = stream.into_split();
+    set_socket_buffer(&stream, libc::SO_RCVBUF, SOCKET_BUF_SIZE);
+    set_socket_buffer(&stream, libc::SO_SNDBUF, SOCKET_BUF_SIZE);
+    let (reader, writer) = stream.into_split();
+    let mut reader = BufReader::with_capacity(PROXY_READ_BUF_SIZE, reader);
 
     // Read registration frame: 4 bytes length + JSON
     let reg: Registration = {
@@ -193,12 +288,14 @@ async fn handle_proxy_connection(
 
     let session_name = reg.name.clone();
     let tty = reg.tty.clone();
+    let binary_input = reg.binary_input();
     info!(
         session_id = %session_id,
         name = %reg.name,
         shell = %reg.shell,
         pid = reg.pid,
         tty = %reg.tty,
+        proxy_version = reg.proxy_version,
         "pty-proxy connected"
     );
 
@@ -214,12 +311,12 @@ async fn handle_proxy_connection(
         let mut sessions_guard = sessions.lock().await;
         sessions_guard.insert(
             session_id.clone(),
-            SessionHandle { info, writer },
+            SessionHandle { info, writer, binary_input },
         );
     }
     {
         let mut tty_guard = tty_map.lock().await;
-        tty_guard.insert(session_id.clone(), tty.clone());
+        tty_guard.insert(session_id.clone(), TtyEntry { tty, closing: false });
     }
 
     // Notify: session attached
@@ -241,6 +338,12 @@ async fn handle_proxy_connection(
     });
     info!(session_id = %session_id, "pty-proxy disconnected");
 
+    // Session ids are never reused, so the mapping can simply expire
+    tokio::spawn(async move {
+        tokio::time::sleep(TTY_MAP_GRACE).await;
+        tty_map.lock().await.remove(&session_id);
+    });
+
     // Don't auto-close the Terminal.app window here. When the user types `exit`,
     // Terminal.app handles the window according to its own preferences. We only
     // force-close when the user explicitly clicks Close in the browser UI
@@ -249,11 +352,27 @@ async fn handle_proxy_connection(
     result
 }
 
+/// Best-effort socket buffer sizing; the kernel may clamp the value.
+fn set_socket_buffer(stream: &UnixStream, opt: libc::c_int, size: libc::c_int) {
+    let ret = unsafe {
+        libc::setsockopt(
+            stream.as_raw_fd(),
+            libc::SOL_SOCKET,
+            opt,
+            &size as *const libc::c_int as *const libc::c_void,
+            std::mem::size_of::<libc::c_int>() as libc::socklen_t,
+        )
+    };
+    if ret != 0 {
+        debug!(opt = opt, "setsockopt failed: {}", std::io::Error::last_os_error());
+    }
+}
+
 /// Read length-prefixed frames from pty-proxy.
 /// Frame format: 4 bytes big-endian length + payload
 /// Payload: first byte is tag ('I' = input echo, 'O' = output, '{' = JSON control)
 async fn read_proxy_frames(
-    reader: &mut tokio::net::unix::OwnedReadHalf,
+    reader: &mut ProxyReader,
     session_id: &str,
     event_tx: &mpsc::UnboundedSender<PtyEvent>,
 ) -> Result<(), Box<dyn std::error::Error + Send + Sync>> {
@@ -280,10 +399,13 @@ async fn read_proxy_frames(
         // Dispatch based on tag
         match payload[0] {
             b'O' => {
-                // Output from shell -> forward to browser
+                // Output from shell -> forward to browser, folding in any
+                // further output frames that have already been buffered
+                let mut data = payload.split_off(1);
+                coalesce_buffered_output(reader, &mut data);
                 let _ = event_tx.send(PtyEvent::Output {
                     session_id: session_id.to_string(),
-                    data: payload[1..].to_vec(),
+                    data,
                 });
             }
             b'I' => {
@@ -292,22 +414,21 @@ async fn read_proxy_frames(
             }
             b'{' => {
                 // JSON control message (e.g., resize from terminal)
-                let text = String::from_utf8_lossy(&payload);
-                debug!(session_id = %session_id, "Control message from proxy: {}", text);
-
-                // Parse resize and forward to browser
-                if let Ok(json) = serde_json::from_slice::<serde_json::Value>(&payload) {
-                    if json.get("type").and_then(|t| t.as_str()) == Some("resize") {
-                        if let (Some(cols), Some(rows)) = (
-                            json.get("cols").and_then(|c| c.as_u64()),
-                            json.get("rows").and_then(|r| r.as_u64()),
-                        ) {
-                            let _ = event_tx.send(PtyEvent::SessionResize {
-                                session_id: session_id.to_string(),
-                                cols: cols as u16,
-                                rows: rows as u16,
-                            });
-                        }
+                match serde_json::from_slice::<ProxyControl>(&payload) {
+                    Ok(ProxyControl::Resize { cols, rows }) => {
+                        debug!(session_id = %session_id, cols = cols, rows = rows, "Resize from proxy");
+                        let _ = event_tx.send(PtyEvent::SessionResize {
+                            session_id: session_id.to_string(),
+                            cols,
+                            rows,
+                        });
+                    }
+                    Err(_) => {
+                        debug!(
+                            session_id = %session_id,
+                            "Unhandled control message from proxy: {}",
+                            String::from_utf8_lossy(&payload)
+                        );
                     }
                 }
             }
@@ -318,15 +439,47 @@ async fn read_proxy_frames(
     }
 }
 
-/// Send a length-prefixed frame atomically to a pty-proxy session.
+/// Append complete 'O' frames already sitting in the read buffer to `data`.
+///
+/// Never waits on the socket: stops at the first incomplete or non-output
+/// frame (so ordering with control frames is preserved), or once the batch
+/// would exceed MAX_OUTPUT_BATCH.
+fn coalesce_buffered_output(reader: &mut ProxyReader, data: &mut Vec<u8>) {
+    loop {
+        let buf = reader.buffer();
+        if buf.len() < 5 {
+            return;
+        }
+        let len = u32::from_be_bytes([buf[0], buf[1], buf[2], buf[3]]) as usize;
+        if len == 0 || buf[4] != b'O' || buf.len() < 4 + len {
+            return;
+        }
+        if data.len() + len - 1 > MAX_OUTPUT_BATCH {
+            return;
+        }
+        data.extend_from_slice(&buf[5..4 + len]);
+        reader.consume(4 + len);
+    }
+}
+
+/// Start a frame for send_frame: room for the length prefix, with the
+/// payload to be appended directly after it.
+fn new_frame(payload_capacity: usize) -> Vec<u8> {
+    let mut frame = Vec::with_capacity(4 + payload_capacity);
+    frame.extend_from_slice(&[0; 4]);
+    frame
+}
+
+/// Send a frame built with new_frame to a pty-proxy session.
+/// Fills in the length prefix, so prefix and payload go out in one write
+/// without copying the payload again.
 async fn send_frame(
     writer: &mut tokio::net::unix::OwnedWriteHalf,
-    data: &[u8],
+    mut frame: Vec<u8>,
 ) -> std::io::Result<()> {
-    let len = (data.len() as u32).to_be_bytes();
-    // Write length prefix and payload together
-    writer.write_all(&len).await?;
-    writer.write_all(data).await?;
+    let len = ((frame.len() - 4) as u32).to_be_bytes();
+    frame[..4].copy_from_slice(&len);
+    writer.write_all(&frame).await?;
     writer.flush().await?;
     Ok(())
 }
@@ -337,18 +490,52 @@ async fn process_commands(
     sessions: Arc<Mutex<HashMap<String, SessionHandle>>>,
     tty_map: TtyMap,
 ) {
-    while let Some(cmd) = command_rx.recv().await {
+    // A command pulled off the queue while batching writes, handled next
+    let mut pending: Option<PtyCommand> = None;
+
+    loop {
+        let cmd = match pending.take() {
+            Some(cmd) => cmd,
+            None => match command_rx.recv().await {
+                Some(cmd) => cmd,
+                None => break,
+            },
+        };
         match cmd {
-            PtyCommand::Write { session_id, data } => {
+            PtyCommand::Write { session_id, mut data } => {
+                // Fold queued writes for the same session into one frame
+                // (e.g. a paste arriving as many small browser messages)
+                loop {
+                    match command_rx.try_recv() {
+                        Ok(PtyCommand::Write { session_id: next_id, data: more })
+                            if next_id == session_id
+                                && data.len() + more.len() <= MAX_INPUT_BATCH =>
+                        {
+                            data.extend_from_slice(&more);
+                        }
+                        Ok(other) => {
+                            pending = Some(other);
+                            break;
+                        }
+                        Err(_) => break,
+                    }
+                }
                 let mut sessions_guard = sessions.lock().await;
                 if let Some(session) = sessions_guard.get_mut(&session_id) {
-                    // Send as JSON input message, length-prefixed
-                    let msg = serde_json::json!({
-                        "type": "input",
-                        "data": data,
-                    });
-                    let json = serde_json::to_vec(&msg).unwrap();
-                    if let Err(e) = send_frame(&mut session.writer, &json).await {
+                    let frame = if session.binary_input {
+                        // Raw input tagged 'I', length-prefixed
+                        let mut frame = new_frame(1 + data.len());
+                        frame.push(b'I');
+                        frame.extend_from_slice(&data);
+                        frame
+                    } else {
+                        // Send as JSON input message, length-prefixed
+                        let msg = InputMessage { kind: "input", data: &data };
+                        let mut frame = new_frame(32 + 4 * data.len());
+                        serde_json::to_writer(&mut frame, &msg).unwrap();
+                        frame
+                    };
+                    if let Err(e) = send_frame(&mut session.writer, frame).await {
                         warn!(session_id = %session_id, error = %e, "Write failed");
                     }
                 }
@@ -357,30 +544,45 @@ async fn process_commands(
                 // Close the Terminal.app window FIRST — this kills the shell
                 // naturally and prevents Terminal.app from reopening a new shell
                 // (which happens when pty-proxy exits with code 0).
-                let tty = {
-                    let tty_guard = tty_map.lock().await;
-                    tty_guard.get(&session_id).cloned()
-                };
-
-                if let Some(tty) = tty {
-                    info!(session_id = %session_id, tty = %tty, "Closing terminal window first");
-                    tokio::task::spawn_blocking(move || {
-                        close_terminal_window_force(&tty);
-                    }).await.ok();
-                } else {
-                    // Fallback: send close message to pty-proxy directly
-                    let mut sessions_guard = sessions.lock().await;
-                    if let Some(session) = sessions_guard.get_mut(&session_id) {
-                        let pid = session.info.pid;
-                        info!(session_id = %session_id, pid = pid, "No TTY found, sending close to pty-proxy");
-                        let msg = serde_json::json!({ "type": "close" });
-                        let json = serde_json::to_vec(&msg).unwrap();
-                        if let Err(e) = send_frame(&mut session.writer, &json).await {
-                            warn!(session_id = %session_id, error = %e, "Close message failed, killing by PID");
-                            unsafe { libc::kill(pid as i32, libc::SIGTERM); }
+                let action = begin_window_close(&mut *tty_map.lock().await, &session_id);
+
+                match action {
+                    WindowClose::AlreadyClosing => {
+                        // A repeat kill (e.g. from a second browser) must not
+                        // fall back to the close message
+                        debug!(session_id = %session_id, "Window close already in progress");
+                    }
+                    WindowClose::Close(tty) => {
+                        info!(session_id = %session_id, tty = %tty, "Closing terminal window first");
+                        // Not awaited inline: osascript takes hundreds of ms and
+                        // input for other sessions must not queue up behind it
+                        let tty_map = tty_map.clone();
+                        tokio::spawn(async move {
+                            let _ = tokio::task::spawn_blocking(move || {
+                                close_terminal_window_force(&tty);
+                            })
+                            .await;
+                            // Allow a retry if the window survived
+                            if let Some(entry) = tty_map.lock().await.get_mut(&session_id) {
+                                entry.closing = false;
+                            }
+                        });
+                    }
+                    WindowClose::NoTty => {
+                        // Fallback: send close message to pty-proxy directly
+                        let mut sessions_guard = sessions.lock().await;
+                        if let Some(session) = sessions_guard.get_mut(&session_id) {
+                            let pid = session.info.pid;
+                            info!(session_id = %session_id, pid = pid, "No TTY found, sending close to pty-proxy");
+                            let mut frame = new_frame(CLOSE_MESSAGE.len());
+                            frame.extend_from_slice(CLOSE_MESSAGE);
+                            if let Err(e) = send_frame(&mut session.writer, frame).await {
+                                warn!(session_id = %session_id, error = %e, "Close message failed, killing by PID");
+                                unsafe { libc::kill(pid as i32, libc::SIGTERM); }
+                            }
+                        } else {
+                            info!(session_id = %session_id, "Session already disconnected, nothing to kill");
                         }
-                    } else {
-                        info!(session_id = %session_id, "Session already disconnected, nothing to kill");
                     }
                 }
             }
@@ -445,3 +647,220 @@ impl Drop for PtyManager {
         }
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// A session handle whose writes land on the returned fake pty-proxy end.
+    fn session_pair(pid: u32, binary_input: bool) -> (SessionHandle, UnixStream) {
+        let (ours, proxy) = UnixStream::pair().unwrap();
+        let (_, writer) = ours.into_split();
+        let info = PtySessionInfo {
+            name: "test".into(),
+            shell: "/bin/sh".into(),
+            pid,
+            tty: "unknown".into(),
+        };
+        (SessionHandle { info, writer, binary_input }, proxy)
+    }
+
+    async fn read_frame(proxy: &mut UnixStream) -> Vec<u8> {
+        let len = proxy.read_u32().await.unwrap();
+        let mut payload = vec![0u8; len as usize];
+        proxy.read_exact(&mut payload).await.unwrap();
+        payload
+    }
+
+    fn output_frame(payload: &[u8]) -> Vec<u8> {
+        let mut frame = ((1 + payload.len()) as u32).to_be_bytes().to_vec();
+        frame.push(b'O');
+        frame.extend_from_slice(payload);
+        frame
+    }
+
+    /// A ProxyReader whose buffer already holds `bytes`.
+    async fn buffered_reader(bytes: &[u8]) -> ProxyReader {
+        let (a, mut b) = UnixStream::pair().unwrap();
+        b.write_all(bytes).await.unwrap();
+        let (read_half, _) = a.into_split();
+        let mut reader = BufReader::with_capacity(PROXY_READ_BUF_SIZE, read_half);
+        reader.fill_buf().await.unwrap();
+        assert_eq!(reader.buffer().len(), bytes.len());
+        reader
+    }
+
+    #[tokio::test]
+    async fn test_coalesce_leaves_partial_frame() {
+        let partial = output_frame(b"third");
+        let mut bytes = output_frame(b"first");
+        bytes.extend(output_frame(b"second"));
+        bytes.extend_from_slice(&partial[..partial.len() - 2]);
+        let mut reader = buffered_reader(&bytes).await;
+
+        let mut data = b"zero".to_vec();
+        coalesce_buffered_output(&mut reader, &mut data);
+        assert_eq!(data, b"zerofirstsecond");
+        assert_eq!(reader.buffer(), &partial[..partial.len() - 2]);
+    }
+
+    #[tokio::test]
+    async fn test_coalesce_stops_at_control_frame() {
+        let control = br#"{"type":"resize","cols":80,"rows":24}"#;
+        let mut bytes = output_frame(b"before");
+        let control_start = bytes.len();
+        bytes.extend_from_slice(&(control.len() as u32).to_be_bytes());
+        bytes.extend_from_slice(control);
+        bytes.extend(output_frame(b"after"));
+        let mut reader = buffered_reader(&bytes).await;
+
+        let mut data = Vec::new();
+        coalesce_buffered_output(&mut reader, &mut data);
+        assert_eq!(data, b"before");
+        assert_eq!(reader.buffer(), &bytes[control_start..]);
+    }
+
+    #[tokio::test]
+    async fn test_coalesce_respects_batch_cap() {
+        let mut bytes = output_frame(&[b'x'; 10]);
+        let second_start = bytes.len();
+        bytes.extend(output_frame(&[b'y'; 10]));
+        let mut reader = buffered_reader(&bytes).await;
+
+        // Room for exactly one more 10-byte payload
+        let mut data = vec![b'a'; MAX_OUTPUT_BATCH - 10];
+        coalesce_buffered_output(&mut reader, &mut data);
+        assert_eq!(data.len(), MAX_OUTPUT_BATCH);
+        assert!(data.ends_with(&[b'x'; 10]));
+        assert_eq!(reader.buffer(), &bytes[second_start..]);
+    }
+
+    #[test]
+    fn test_registration_without_version_is_legacy() {
+        let json = r#"{"name":"zsh - ~","shell":"/bin/zsh","pid":42,"tty":"/dev/ttys001"}"#;
+        let reg: Registration = serde_json::from_str(json).unwrap();
+        assert_eq!(reg.proxy_version, 1);
+        assert!(!reg.binary_input());
+    }
+
+    #[test]
+    fn test_registration_version_2_selects_binary_input() {
+        let json = r#"{"name":"zsh - ~","shell":"/bin/zsh","pid":42,"tty":"/dev/ttys001","proxy_version":2}"#;
+        let reg: Registration = serde_json::from_str(json).unwrap();
+        assert_eq!(reg.proxy_version, 2);
+        assert!(reg.binary_input());
+    }
+
+    #[test]
+    fn test_input_message_serialization() {
+        // Older proxies decode `data` as a JSON array of byte values
+        let msg = InputMessage { kind: "input", data: &[1, 2] };
+        let json = serde_json::to_string(&msg).unwrap();
+        assert_eq!(json, r#"{"type":"input","data":[1,2]}"#);
+    }
+
+    #[test]
+    fn test_begin_window_close() {
+        let mut tty_map = HashMap::new();
+        tty_map.insert(
+            "s1".to_string(),
+            TtyEntry { tty: "/dev/ttys001".into(), closing: false },
+        );
+        assert_eq!(
+            begin_window_close(&mut tty_map, "s1"),
+            WindowClose::Close("/dev/ttys001".into())
+        );
+        assert_eq!(begin_window_close(&mut tty_map, "s1"), WindowClose::AlreadyClosing);
+        assert_eq!(begin_window_close(&mut tty_map, "s2"), WindowClose::NoTty);
+    }
+
+    #[tokio::test]
+    async fn test_repeat_kill_does_not_send_close_message() {
+        let (handle, mut proxy) = session_pair(999_999, true);
+        let sessions = Arc::new(Mutex::new(HashMap::from([("s1".to_string(), handle)])));
+        // The first kill's window close is still running
+        let tty_map: TtyMap = Arc::new(Mutex::new(HashMap::from([(
+            "s1".to_string(),
+            TtyEntry { tty: "/dev/ttys001".into(), closing: true },
+        )])));
+
+        let (tx, rx) = mpsc::unbounded_channel();
+        tx.send(PtyCommand::KillSession { session_id: "s1".into() }).unwrap();
+        tx.send(PtyCommand::Write { session_id: "s1".into(), data: b"x".to_vec() }).unwrap();
+        drop(tx);
+        process_commands(rx, sessions, tty_map).await;
+
+        // The write is the first thing the proxy sees: no close message
+        assert_eq!(read_frame(&mut proxy).await, b"Ix");
+    }
+
+    #[tokio::test]
+    async fn test_write_batching_keeps_order() {
+        let (s1, mut proxy1) = session_pair(999_999, true);
+        let (s2, mut proxy2) = session_pair(999_999, false);
+        let sessions = Arc::new(Mutex::new(HashMap::from([
+            ("s1".to_string(), s1),
+            ("s2".to_string(), s2),
+        ])));
+
+        let (tx, rx) = mpsc::unbounded_channel();
+        for (sid, data) in [("s1", "ab"), ("s1", "cd"), ("s2", "x"), ("s1", "ef"), ("s1", "gh")] {
+            tx.send(PtyCommand::Write { session_id: sid.into(), data: data.into() }).unwrap();
+        }
+        drop(tx);
+        process_commands(rx, sessions, TtyMap::default()).await;
+
+        // Writes fold only with adjacent writes for the same session
+        assert_eq!(read_frame(&mut proxy1).await, b"Iabcd");
+        assert_eq!(read_frame(&mut proxy1).await, b"Iefgh");
+        assert_eq!(read_frame(&mut proxy2).await, br#"{"type":"input","data":[120]}"#);
+    }
+
+    #[tokio::test]
+    async fn test_write_batching_splits_at_cap() {
+        let (s1, mut proxy) = session_pair(999_999, true);
+        let sessions = Arc::new(Mutex::new(HashMap::from([("s1".to_string(), s1)])));
+
+        let (tx, rx) = mpsc::unbounded_channel();
+        tx.send(PtyCommand::Write { session_id: "s1".into(), data: vec![b'a'; MAX_INPUT_BATCH - 1] })
+            .unwrap();
+        tx.send(PtyCommand::Write { session_id: "s1".into(), data: b"bb".to_vec() }).unwrap();
+        drop(tx);
+        // Spawned: the first frame is larger than the socket buffer
+        let task = tokio::spawn(process_commands(rx, sessions, TtyMap::default()));
+
+        let first = read_frame(&mut proxy).await;
+        assert_eq!(first.len(), MAX_INPUT_BATCH);
+        assert!(first[1..].iter().all(|&b| b == b'a'));
+        assert_eq!(read_frame(&mut proxy).await, b"Ibb");
+        task.await.unwrap();
+    }
+
+    #[tokio::test]
+    async fn test_write_batching_runs_held_back_commands() {
+        use std::os::unix::process::ExitStatusExt;
+
+        let mut shell = std::process::Command::new("sleep").arg("30").spawn().unwrap();
+        let (s1, mut proxy) = session_pair(shell.id(), true);
+        let sessions = Arc::new(Mutex::new(HashMap::from([("s1".to_string(), s1)])));
+
+        // KillSession and Shutdown are each pulled off the queue while a
+        // write is being batched, and must still run afterwards
+        let (tx, rx) = mpsc::unbounded_channel();
+        tx.send(PtyCommand::Write { session_id: "s1".into(), data: b"a".to_vec() }).unwrap();
+        tx.send(PtyCommand::KillSession { session_id: "s1".into() }).unwrap();
+        tx.send(PtyCommand::Write { session_id: "s1".into(), data: b"b".to_vec() }).unwrap();
+        tx.send(PtyCommand::Shutdown).unwrap();
+        // tx stays open, so only Shutdown can end the loop
+        let run = process_commands(rx, sessions, TtyMap::default());
+        tokio::time::timeout(std::time::Duration::from_secs(5), run)
+            .await
+            .expect("Shutdown did not stop the command loop");
+
+        assert_eq!(read_frame(&mut proxy).await, b"Ia");
+        assert_eq!(read_frame(&mut proxy).await, CLOSE_MESSAGE);
+        assert_eq!(read_frame(&mut proxy).await, b"Ib");
+        assert_eq!(shell.wait().unwrap().signal(), Some(libc::SIGTERM));
+        drop(tx);
+    }
+}
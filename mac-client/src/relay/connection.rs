@@ -1,5 +1,6 @@
 use crate::protocol::ControlMessage;
 use futures_util::{SinkExt, StreamExt};
+use serde::Deserialize;
 use std::error::Error;
 use std::sync::mpsc::Sender;
 use std::time::Duration;
@@ -46,6 +47,16 @@ pub enum RelayCommand {
     Reconnect,
 }
 
+/// Maximum number of queued commands written before a flush.
+const MAX_COMMAND_BATCH: usize = 64;
+
+/// JSON control payload carried inside a binary frame from the relay.
+#[derive(Deserialize)]
+#[serde(tag = "type", rename_all = "snake_case")]
+enum BinaryControl {
+    CloseSession,
+}
+
 /// WebSocket client for connecting to the relay server.
 /// Handles connection, registration, and auto-reconnect with exponential backoff.
 pub struct RelayClient {
@@ -170,57 +181,30 @@ impl RelayClient {
 
                 // Handle commands from IPC (send terminal data to relay)
                 cmd = self.command_rx.recv() => {
-                    match cmd {
-                        Some(RelayCommand::SendTerminalData { session_id, data }) => {
-                            if let Err(e) = Self::send_terminal_data(&mut write, &session_id, &data).await {
-                                tracing::warn!("Failed to send terminal data: {}", e);
-                            }
-                        }
-                        Some(RelayCommand::SendSessionList { sessions }) => {
-                            let msg = ControlMessage::SessionList {
-                                sessions: sessions.into_iter().map(|(id, name)| {
-                                    crate::protocol::SessionInfo { id, name }
-                                }).collect(),
-                            };
-                            let json = serde_json::to_string(&msg).unwrap();
-                            tracing::debug!("Sending SessionList: {}", json);
-                            if let Err(e) = write.send(Message::Text(json.into())).await {
-                                tracing::warn!("Failed to send session list: {}", e);
-                            }
-                        }
-                        Some(RelayCommand::SendSessionConnected { session_id, name }) => {
-                            let msg = ControlMessage::SessionConnected { session_id, name };
-                            let json = serde_json::to_string(&msg).unwrap();
-                            tracing::debug!("Sending SessionConnected: {}", json);
-                            if let Err(e) = write.send(Message::Text(json.into())).await {
-                                tracing::warn!("Failed to send session connected: {}", e);
-                            }
-                        }
-                        Some(RelayCommand::SendSessionDisconnected { session_id }) => {
-                            let msg = ControlMessage::SessionDisconnected { session_id };
-                            let json = serde_json::to_string(&msg).unwrap();
-                            tracing::debug!("Sending SessionDisconnected: {}", json);
-                            if let Err(e) = write.send(Message::Text(json.into())).await {
-                                tracing::warn!("Failed to send session disconnected: {}", e);
-                            }
-                        }
-                        Some(RelayCommand::SendSessionResize { session_id, cols, rows }) => {
-                            let msg = ControlMessage::SessionResize { session_id, cols, rows };
-                            let json = serde_json::to_string(&msg).unwrap();
-                            tracing::debug!("Sending SessionResize: {}", json);
-                            if let Err(e) = write.send(Message::Text(json.into())).await {
-                                tracing::warn!("Failed to send session resize: {}", e);
+                    let Some(cmd) = cmd else {
+                        tracing::info!("Command channel closed");
+                        break;
+                    };
+                    // Queue this command plus any already waiting, then flush
+                    // once instead of once per message
+                    let mut reconnect = Self::feed_command(&mut write, cmd).await;
+                    let mut batched = 1;
+                    while !reconnect && batched < MAX_COMMAND_BATCH {
+                        match self.command_rx.try_recv() {
+                            Ok(cmd) => {
+                                reconnect = Self::feed_command(&mut write, cmd).await;
+                                batched += 1;
                             }
+                            Err(_) => break,
                         }
-                        Some(RelayCommand::Reconnect) => {
-                            tracing::info!("Reconnect requested, closing connection");
-                            let _ = write.send(Message::Close(None)).await;
-                            break;
-                        }
-                        None => {
-                            tracing::info!("Command channel closed");
-                            break;
-                        }
+                    }
+                    if let Err(e) = write.flush().await {
+                        tracing::warn!("Failed to flush to relay: {}", e);
+                    }
+                    if reconnect {
+                        tracing::info!("Reconnect requested, closing connection");
+                        let _ = write.send(Message::Close(None)).await;
+                        break;
                     }
                 }
             }
@@ -229,7 +213,60 @@ impl RelayClient {
         Ok(())
     }
 
-    /// Send terminal data to relay for a specific session.
+    /// Queue the WebSocket message for a command without flushing.
+    /// Returns true if the command asks to reconnect (nothing is queued).
+    async fn feed_command<S>(write: &mut S, cmd: RelayCommand) -> bool
+    where
+        S: SinkExt<Message, Error = tokio_tungstenite::tungstenite::Error> + Unpin,
+    {
+        match cmd {
+            RelayCommand::SendTerminalData { session_id, data } => {
+                if let Err(e) = Self::send_terminal_data(write, &session_id, &data).await {
+                    tracing::warn!("Failed to send terminal data: {}", e);
+                }
+            }
+            RelayCommand::SendSessionList { sessions } => {
+                let msg = ControlMessage::SessionList {
+                    sessions: sessions.into_iter().map(|(id, name)| {
+                        crate::protocol::SessionInfo { id, name }
+                    }).collect(),
+                };
+                let json = serde_json::to_string(&msg).unwrap();
+                tracing::debug!("Sending SessionList: {}", json);
+                if let Err(e) = write.feed(Message::Text(json.into())).await {
+                    tracing::warn!("Failed to send session list: {}", e);
+                }
+            }
+            RelayCommand::SendSessionConnected { session_id, name } => {
+                let msg = ControlMessage::SessionConnected { session_id, name };
+                let json = serde_json::to_string(&msg).unwrap();
+                tracing::debug!("Sending SessionConnected: {}", json);
+                if let Err(e) = write.feed(Message::Text(json.into())).await {
+                    tracing::warn!("Failed to send session connected: {}", e);
+                }
+            }
+            RelayCommand::SendSessionDisconnected { session_id } => {
+                let msg = ControlMessage::SessionDisconnected { session_id };
+                let json = serde_json::to_string(&msg).unwrap();
+                tracing::debug!("Sending SessionDisconnected: {}", json);
+                if let Err(e) = write.feed(Message::Text(json.into())).await {
+                    tracing::warn!("Failed to send session disconnected: {}", e);
+                }
+            }
+            RelayCommand::SendSessionResize { session_id, cols, rows } => {
+                let msg = ControlMessage::SessionResize { session_id, cols, rows };
+                let json = serde_json::to_string(&msg).unwrap();
+                tracing::debug!("Sending SessionResize: {}", json);
+                if let Err(e) = write.feed(Message::Text(json.into())).await {
+                    tracing::warn!("Failed to send session resize: {}", e);
+                }
+            }
+            RelayCommand::Reconnect => return true,
+        }
+        false
+    }
+
+    /// Queue terminal data to relay for a specific session (caller flushes).
     ///
     /// Frame format: 1 byte session_id length + session_id bytes + terminal data
     async fn send_terminal_data<S>(
@@ -251,7 +288,7 @@ impl RelayClient {
             session_id,
             data.len()
         );
-        write.send(Message::Binary(frame.into())).await?;
+        write.feed(Message::Binary(frame.into())).await?;
         Ok(())
     }
 
@@ -282,18 +319,12 @@ impl RelayClient {
 
         // Check if payload is a JSON control message (starts with '{')
         if payload.first() == Some(&b'{') {
-            if let Ok(text) = std::str::from_utf8(payload) {
-                if let Ok(json) = serde_json::from_str::<serde_json::Value>(text) {
-                    let msg_type = json.get("type").and_then(|t| t.as_str());
-
-                    if msg_type == Some("close_session") {
-                        tracing::info!("Received close_session: session={}", session_id);
-                        let _ = self.event_tx.send(RelayEvent::CloseSession {
-                            session_id,
-                        });
-                        return;
-                    }
-                }
+            if let Ok(BinaryControl::CloseSession) = serde_json::from_slice(payload) {
+                tracing::info!("Received close_session: session={}", session_id);
+                let _ = self.event_tx.send(RelayEvent::CloseSession {
+                    session_id,
+                });
+                return;
             }
         }
 
@@ -374,6 +405,23 @@ mod tests {
         };
     }
 
+    #[test]
+    fn test_binary_close_session() {
+        let (tx, rx) = std::sync::mpsc::channel();
+        let (_cmd_tx, cmd_rx) = tokio::sync::mpsc::unbounded_channel();
+        let client = RelayClient::new("ws://localhost:3000/ws".into(), tx, cmd_rx);
+
+        let mut frame = vec![6u8];
+        frame.extend_from_slice(b"sess-1");
+        frame.extend_from_slice(br#"{"type":"close_session"}"#);
+        client.handle_binary_message(&frame);
+
+        match rx.try_recv() {
+            Ok(RelayEvent::CloseSession { session_id }) => assert_eq!(session_id, "sess-1"),
+            other => panic!("Expected CloseSession event, got {:?}", other),
+        }
+    }
+
     #[test]
     fn test_relay_client_creation() {
         let (tx, _rx) = std::sync::mpsc::channel();
@@ -20,13 +20,24 @@ use nix::sys::wait::{waitpid, WaitStatus};
 use nix::unistd::{close, dup2, execvp, fork, read, setsid, write, ForkResult, Pid};
 use serde::{Deserialize, Serialize};
 use std::ffi::CString;
-use std::os::fd::{AsRawFd, BorrowedFd, FromRawFd, IntoRawFd, OwnedFd, RawFd};
+use std::os::fd::{AsFd, AsRawFd, BorrowedFd, FromRawFd, IntoRawFd, OwnedFd, RawFd};
 use std::sync::atomic::{AtomicBool, AtomicI32, Ordering};
-use std::time::Instant;
+use std::time::{Duration, Instant};
 
 const SOCKET_PATH: &str = "/tmp/terminal-remote.sock";
-const BUF_SIZE: usize = 8192;
+const BUF_SIZE: usize = 65536;
+/// Send/receive buffer size requested for the mac-client socket.
+/// The macOS default for Unix sockets is only 8 KiB.
+const SOCKET_BUF_SIZE: libc::c_int = 1 << 20;
 const RECONNECT_INTERVAL_SECS: u64 = 5;
+/// Quiet period before a terminal resize is reported to mac-client.
+/// Dragging a window edge delivers a burst of SIGWINCHs; only the final
+/// size needs to reach the browser.
+const RESIZE_NOTIFY_DEBOUNCE: Duration = Duration::from_millis(50);
+
+/// Protocol version reported at registration.
+/// 2: accepts raw 'I'-tagged input frames from mac-client.
+const PROXY_VERSION: u8 = 2;
 
 /// Registration message sent to mac-client on connect.
 #[derive(Serialize)]
@@ -39,6 +50,8 @@ struct Registration {
 }
 
 /// Control messages received from mac-client.
+/// Browser input normally arrives as a raw 'I'-tagged frame instead;
+/// the JSON Input variant is kept for older mac-clients.
 #[derive(Deserialize)]
 #[serde(tag = "type", rename_all = "snake_case")]
 enum ControlMessage {
@@ -201,8 +214,8 @@ fn main() {
 }
 
 /// Main proxy loop. Returns exit code.
-/// FIX #2 & #4: socket_fd is now mutable (Option<OwnedFd>) so we can reconnect.
-fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shell: &str) -> i32 {
+/// FIX #2 & #4: socket_fd is now mutable (Option<MacConnection>) so we can reconnect.
+fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<MacConnection>, child: Pid, shell: &str) -> i32 {
     let mut buf = [0u8; BUF_SIZE];
 
     // Buffer for incoming data from mac-client (browser input)
@@ -214,6 +227,17 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
     // Reconnect tracking
     let mut last_reconnect_attempt: Option<Instant> = None;
 
+    // Pending (debounced) resize notification to mac-client
+    let mut resize_notify_at: Option<Instant> = None;
+
+    // Last size reported to mac-client (connect_to_mac_client sends the
+    // initial size), so unchanged sizes are not re-sent
+    let mut last_notified_size = if socket_fd.is_some() {
+        get_terminal_size(STDIN_FILENO).map(|size| (size.ws_col, size.ws_row))
+    } else {
+        None
+    };
+
     loop {
         // Check if child exited
         if CHILD_EXITED.load(Ordering::Relaxed) {
@@ -224,13 +248,19 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
         if SIGWINCH_RECEIVED.swap(false, Ordering::Relaxed) {
             if let Some(size) = get_terminal_size(STDIN_FILENO) {
                 set_pty_size(master_fd, &size);
-                // Also notify mac-client about resize
-                if let Some(ref sock) = socket_fd {
-                    let resize_msg = format!(
-                        "{{\"type\":\"resize\",\"cols\":{},\"rows\":{}}}",
-                        size.ws_col, size.ws_row
-                    );
-                    send_frame(sock.as_raw_fd(), resize_msg.as_bytes());
+                // Notify mac-client once the resize settles
+                resize_notify_at = Some(Instant::now() + RESIZE_NOTIFY_DEBOUNCE);
+            }
+        }
+
+        if let Some(at) = resize_notify_at {
+            if Instant::now() >= at {
+                resize_notify_at = None;
+                if let (Some(ref mut sock), Some(size)) = (&mut socket_fd, get_terminal_size(STDIN_FILENO)) {
+                    if last_notified_size != Some((size.ws_col, size.ws_row)) {
+                        sock.send_resize(&size);
+                        last_notified_size = Some((size.ws_col, size.ws_row));
+                    }
                 }
             }
         }
@@ -247,6 +277,8 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                     set_nonblocking(fd.as_raw_fd());
                     socket_fd = Some(fd);
                     frame_buf.clear(); // reset frame buffer for new connection
+                    last_notified_size =
+                        get_terminal_size(STDIN_FILENO).map(|size| (size.ws_col, size.ws_row));
                 }
             }
         }
@@ -263,14 +295,30 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
             ),
         ];
         if let Some(ref sock) = socket_fd {
+            // Wait for writability only while a frame is partially sent
+            let events = if sock.has_pending() {
+                PollFlags::POLLIN | PollFlags::POLLOUT
+            } else {
+                PollFlags::POLLIN
+            };
             poll_fds.push(PollFd::new(
                 unsafe { BorrowedFd::borrow_raw(sock.as_raw_fd()) },
-                PollFlags::POLLIN,
+                events,
             ));
         }
 
-        // Poll with 100ms timeout (to check signals)
-        match poll(&mut poll_fds, PollTimeout::from(100u16)) {
+        // Poll with 100ms timeout (to check signals), or until a pending
+        // resize notification is due. Round up so the last sub-millisecond
+        // before the deadline doesn't become a zero timeout busy loop.
+        let timeout_ms = match resize_notify_at {
+            Some(at) => at
+                .saturating_duration_since(Instant::now())
+                .as_micros()
+                .div_ceil(1000)
+                .min(100) as u16,
+            None => 100,
+        };
+        match poll(&mut poll_fds, PollTimeout::from(timeout_ms)) {
             Ok(0) => continue, // timeout
             Err(nix::errno::Errno::EINTR) => continue,
             Err(e) => {
@@ -289,11 +337,8 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                         // Write to shell
                         write_all(master_fd, &buf[..n]);
                         // Tee input to mac-client (tagged as input)
-                        if let Some(ref sock) = socket_fd {
-                            let mut msg = Vec::with_capacity(1 + n);
-                            msg.push(b'I'); // 'I' = input
-                            msg.extend_from_slice(&buf[..n]);
-                            send_frame(sock.as_raw_fd(), &msg);
+                        if let Some(ref mut sock) = socket_fd {
+                            sock.send_tagged_frame(b'I', &buf[..n]); // 'I' = input
                         }
                     }
                     Err(nix::errno::Errno::EAGAIN | nix::errno::Errno::EINTR) => {}
@@ -314,11 +359,8 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                         // Write to terminal
                         write_all(STDOUT_FILENO, &buf[..n]);
                         // Tee output to mac-client
-                        if let Some(ref sock) = socket_fd {
-                            let mut msg = Vec::with_capacity(1 + n);
-                            msg.push(b'O'); // 'O' = output
-                            msg.extend_from_slice(&buf[..n]);
-                            send_frame(sock.as_raw_fd(), &msg);
+                        if let Some(ref mut sock) = socket_fd {
+                            sock.send_tagged_frame(b'O', &buf[..n]); // 'O' = output
                         }
                     }
                     Err(nix::errno::Errno::EAGAIN | nix::errno::Errno::EINTR) => {}
@@ -333,11 +375,8 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                         Ok(0) | Err(_) => break,
                         Ok(n) => {
                             write_all(STDOUT_FILENO, &buf[..n]);
-                            if let Some(ref sock) = socket_fd {
-                                let mut msg = Vec::with_capacity(1 + n);
-                                msg.push(b'O');
-                                msg.extend_from_slice(&buf[..n]);
-                                send_frame(sock.as_raw_fd(), &msg);
+                            if let Some(ref mut sock) = socket_fd {
+                                sock.send_tagged_frame(b'O', &buf[..n]);
                             }
                         }
                     }
@@ -365,24 +404,27 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                         Ok(n) => {
                             frame_buf.extend_from_slice(&socket_buf[..n]);
                             // Process complete frames (4-byte length prefix + payload)
-                            while frame_buf.len() >= 4 {
+                            // in place, then drop the consumed bytes in one go
+                            let mut pos = 0;
+                            while frame_buf.len() - pos >= 4 {
                                 let len = u32::from_be_bytes([
-                                    frame_buf[0],
-                                    frame_buf[1],
-                                    frame_buf[2],
-                                    frame_buf[3],
+                                    frame_buf[pos],
+                                    frame_buf[pos + 1],
+                                    frame_buf[pos + 2],
+                                    frame_buf[pos + 3],
                                 ]) as usize;
-                                if frame_buf.len() < 4 + len {
+                                if frame_buf.len() - pos < 4 + len {
                                     break; // incomplete frame
                                 }
-                                let payload = frame_buf[4..4 + len].to_vec();
-                                frame_buf.drain(..4 + len);
-                                if handle_mac_client_message(&payload, master_fd, child) {
+                                let payload = &frame_buf[pos + 4..pos + 4 + len];
+                                pos += 4 + len;
+                                if handle_mac_client_message(payload, master_fd, child) {
                                     // Close requested — wait for child and exit with 0
                                     reap_child(child);
                                     return 0;
                                 }
                             }
+                            frame_buf.drain(..pos);
                         }
                         Err(nix::errno::Errno::EAGAIN | nix::errno::Errno::EINTR) => {}
                         Err(_) => {
@@ -393,6 +435,16 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
                     }
                 }
 
+                // Socket drained enough to continue a partially sent frame
+                if revents.contains(PollFlags::POLLOUT) {
+                    if let Some(ref mut sock) = socket_fd {
+                        if !sock.flush_pending() {
+                            socket_fd = None;
+                            frame_buf.clear();
+                        }
+                    }
+                }
+
                 if disconnect {
                     socket_fd = None;
                     frame_buf.clear();
@@ -407,7 +459,12 @@ fn proxy_loop(master_fd: RawFd, mut socket_fd: Option<OwnedFd>, child: Pid, shel
 /// Handle a message from mac-client (browser → shell).
 /// Returns true if pty-proxy should exit cleanly (Close message received).
 fn handle_mac_client_message(payload: &[u8], master_fd: RawFd, child: Pid) -> bool {
-    // Try JSON parse first
+    // Raw input frame: 'I' + bytes, no JSON round-trip
+    if payload.first() == Some(&b'I') {
+        write_all(master_fd, &payload[1..]);
+        return false;
+    }
+    // Try JSON parse
     if let Ok(msg) = serde_json::from_slice::<ControlMessage>(payload) {
         match msg {
             ControlMessage::Input { data } => {
@@ -438,7 +495,7 @@ fn handle_mac_client_message(payload: &[u8], master_fd: RawFd, child: Pid) -> bo
 }
 
 /// Connect to mac-client via Unix socket. Returns None on failure (non-fatal).
-fn connect_to_mac_client(shell: &str, child_pid: Pid) -> Option<OwnedFd> {
+fn connect_to_mac_client(shell: &str, child_pid: Pid) -> Option<MacConnection> {
     use std::os::unix::net::UnixStream;
 
     let stream = match UnixStream::connect(SOCKET_PATH) {
@@ -449,6 +506,11 @@ fn connect_to_mac_client(shell: &str, child_pid: Pid) -> Option<OwnedFd> {
     // FIX #5: Use into_raw_fd() instead of mem::forget to properly transfer ownership.
     let fd = stream.into_raw_fd();
 
+    // Larger socket buffers: fewer wakeups per MB of output, and bursts are
+    // less likely to hit a full buffer on the non-blocking socket
+    set_socket_buffer(fd, libc::SO_SNDBUF, SOCKET_BUF_SIZE);
+    set_socket_buffer(fd, libc::SO_RCVBUF, SOCKET_BUF_SIZE);
+
     // Send registration as length-prefixed JSON
     let tty_name = std::env::var("TTY")
         .or_else(|_| {
@@ -471,7 +533,7 @@ fn connect_to_mac_client(shell: &str, child_pid: Pid) -> Option<OwnedFd> {
         shell: shell.to_string(),
         pid: child_pid.as_raw() as u32,
         tty: tty_name,
-        proxy_version: 1,
+        proxy_version: PROXY_VERSION,
     };
 
     let json = match serde_json::to_vec(&reg) {
@@ -482,28 +544,113 @@ fn connect_to_mac_client(shell: &str, child_pid: Pid) -> Option<OwnedFd> {
         }
     };
 
+    let mut conn = MacConnection {
+        fd: unsafe { OwnedFd::from_raw_fd(fd) },
+        pending: Vec::new(),
+    };
+
     // Send: 4-byte length (big-endian) + JSON
-    send_frame(fd, &json);
+    conn.send_frame(&json);
 
     // Also send initial terminal size
     if let Some(size) = get_terminal_size(STDIN_FILENO) {
+        conn.send_resize(&size);
+    }
+
+    Some(conn)
+}
+
+/// Socket connection to mac-client.
+///
+/// The tee is best-effort: frames that find the socket full are dropped.
+/// A frame that was only partly accepted must still be finished, otherwise
+/// the length-prefixed stream desyncs, so its tail waits in `pending` and
+/// is flushed when poll reports the socket writable. Never blocks: a stalled
+/// mac-client must not freeze the local terminal.
+struct MacConnection {
+    fd: OwnedFd,
+    /// Unsent tail of a partially written frame.
+    pending: Vec<u8>,
+}
+
+impl AsRawFd for MacConnection {
+    fn as_raw_fd(&self) -> RawFd {
+        self.fd.as_raw_fd()
+    }
+}
+
+impl MacConnection {
+    /// Send a length-prefixed frame: 4 bytes big-endian length + payload.
+    /// FIX #1: Use writev() — length prefix and payload in a single syscall.
+    fn send_frame(&mut self, data: &[u8]) {
+        let len = (data.len() as u32).to_be_bytes();
+        let iov = [IoSlice::new(&len), IoSlice::new(data)];
+        self.write_frame(&iov);
+    }
+
+    /// Send a resize control message with the given terminal size.
+    fn send_resize(&mut self, size: &libc::winsize) {
         let resize_msg = format!(
             "{{\"type\":\"resize\",\"cols\":{},\"rows\":{}}}",
             size.ws_col, size.ws_row
         );
-        send_frame(fd, resize_msg.as_bytes());
+        self.send_frame(resize_msg.as_bytes());
     }
 
-    Some(unsafe { OwnedFd::from_raw_fd(fd) })
-}
+    /// Send a tagged frame: 4 bytes big-endian length + tag byte + data.
+    /// The tag is passed as its own iovec so the hot tee path needs no
+    /// per-chunk allocation or copy.
+    fn send_tagged_frame(&mut self, tag: u8, data: &[u8]) {
+        let len = ((1 + data.len()) as u32).to_be_bytes();
+        let tag = [tag];
+        let iov = [IoSlice::new(&len), IoSlice::new(&tag), IoSlice::new(data)];
+        self.write_frame(&iov);
+    }
+
+    /// Whether a partially written frame is waiting for the socket.
+    fn has_pending(&self) -> bool {
+        !self.pending.is_empty()
+    }
+
+    /// Write a frame, or drop it if the socket can't take any of it (or a
+    /// previous frame is still pending). A partial write keeps the rest in
+    /// `pending`.
+    fn write_frame(&mut self, iov: &[IoSlice]) {
+        if self.has_pending() {
+            return;
+        }
+        let mut written = loop {
+            match writev(self.fd.as_fd(), iov) {
+                Ok(n) => break n,
+                Err(nix::errno::Errno::EINTR) => continue,
+                Err(_) => return,
+            }
+        };
+        for part in iov {
+            if written >= part.len() {
+                written -= part.len();
+                continue;
+            }
+            self.pending.extend_from_slice(&part[written..]);
+            written = 0;
+        }
+    }
 
-/// Send a length-prefixed frame atomically: 4 bytes big-endian length + payload.
-/// FIX #1: Use writev() for atomic writes — length prefix and payload in a single syscall.
-fn send_frame(fd: RawFd, data: &[u8]) {
-    let len = (data.len() as u32).to_be_bytes();
-    let iov = [IoSlice::new(&len), IoSlice::new(data)];
-    // Best-effort write, ignore errors (socket may be gone)
-    let _ = writev(unsafe { BorrowedFd::borrow_raw(fd) }, &iov);
+    /// Write as much of the pending tail as the socket accepts.
+    /// Returns false if the connection failed.
+    fn flush_pending(&mut self) -> bool {
+        while self.has_pending() {
+            match write(self.fd.as_fd(), &self.pending) {
+                Ok(n) => {
+                    self.pending.drain(..n);
+                }
+                Err(nix::errno::Errno::EINTR) => continue,
+                Err(nix::errno::Errno::EAGAIN) => return true,
+                Err(_) => return false,
+            }
+        }
+        true
+    }
 }
 
 /// Write all bytes to fd, retrying on EINTR/EAGAIN.
@@ -529,6 +676,22 @@ fn set_nonblocking(fd: RawFd) {
     }
 }
 
+/// Best-effort socket buffer sizing. macOS fails with ENOBUFS (rather than
+/// clamping) above kern.ipc.sb_max; the default buffer is kept then. The
+/// result is ignored: stderr is the user's terminal, and frames are written
+/// whole regardless of buffer size.
+fn set_socket_buffer(fd: RawFd, opt: libc::c_int, size: libc::c_int) {
+    unsafe {
+        libc::setsockopt(
+            fd,
+            libc::SOL_SOCKET,
+            opt,
+            &size as *const libc::c_int as *const libc::c_void,
+            std::mem::size_of::<libc::c_int>() as libc::socklen_t,
+        )
+    };
+}
+
 fn get_terminal_size(fd: RawFd) -> Option<libc::winsize> {
     let mut size: libc::winsize = unsafe { std::mem::zeroed() };
     let ret = unsafe { libc::ioctl(fd, libc::TIOCGWINSZ, &mut size) };
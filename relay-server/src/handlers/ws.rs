@@ -106,6 +106,11 @@ async fn handle_mac_client(
 
     tracing::info!(code = %code, client_id = %client_id, "Mac-client connected");
 
+    // Resolve the session once; everything sent to browsers goes through it
+    let Some(session) = state.get_session(&code) else {
+        return;
+    };
+
     // Spawn task to forward messages from browsers to mac-client
     let code_clone = code.clone();
     let send_task = tokio::spawn(async move {
@@ -125,7 +130,7 @@ async fn handle_mac_client(
         match msg_result {
             Ok(Message::Binary(data)) => {
                 // Forward terminal output to all connected browsers
-                state.broadcast_to_browsers(&code_clone, data.to_vec()).await;
+                session.broadcast_to_browsers(data.to_vec()).await;
             }
             Ok(Message::Text(text)) => {
                 // Handle control messages from mac-client
@@ -135,20 +140,20 @@ async fn handle_mac_client(
                     match &ctrl {
                         ControlMessage::SessionList { sessions } => {
                             tracing::info!(code = %code_clone, "Forwarding SessionList ({} sessions) to browsers", sessions.len());
-                            state.broadcast_text_to_browsers(&code_clone, &text).await;
+                            session.broadcast_text_to_browsers(&text).await;
                         }
                         ControlMessage::SessionConnected { .. } => {
                             tracing::info!(code = %code_clone, "Forwarding SessionConnected to browsers");
-                            state.broadcast_text_to_browsers(&code_clone, &text).await;
+                            session.broadcast_text_to_browsers(&text).await;
                         }
                         ControlMessage::SessionDisconnected { session_id } => {
                             tracing::info!(code = %code_clone, session_id = %session_id, "Forwarding SessionDisconnected to browsers, purging scrollback");
-                            state.purge_session_scrollback(&code_clone, &session_id).await;
-                            state.broadcast_text_to_browsers(&code_clone, &text).await;
+                            session.purge_scrollback(session_id).await;
+                            session.broadcast_text_to_browsers(&text).await;
                         }
                         ControlMessage::SessionResize { session_id, cols, rows } => {
                             tracing::debug!(code = %code_clone, session_id = %session_id, cols = cols, rows = rows, "Forwarding SessionResize to browsers");
-                            state.broadcast_text_to_browsers(&code_clone, &text).await;
+                            session.broadcast_text_to_browsers(&text).await;
                         }
                         _ => {}
                     }
@@ -169,7 +174,7 @@ async fn handle_mac_client(
     let error_msg = serde_json::to_string(&ControlMessage::Error {
         message: "Session disconnected".into(),
     }).unwrap();
-    state.broadcast_text_to_browsers(&code_clone, &error_msg).await;
+    session.broadcast_text_to_browsers(&error_msg).await;
 
     send_task.abort();
     state.remove_session(&code_clone);
@@ -221,8 +226,14 @@ async fn handle_browser(
 
     tracing::info!(code = %code, browser_id = %browser_id, "Browser connected");
 
+    // Resolve the session once; everything sent to the mac-client goes through it
+    let Some(session) = state.get_session(&code) else {
+        state.remove_browser(&code, &browser_id);
+        return;
+    };
+
     // Replay scrollback so browser gets terminal history immediately.
-    let scrollback = state.get_scrollback(&code).await;
+    let scrollback = session.get_scrollback().await;
     if !scrollback.is_empty() {
         tracing::info!(code = %code, frames = scrollback.len(), "Replaying scrollback to browser");
         for frame in scrollback {
@@ -239,7 +250,7 @@ async fn handle_browser(
     };
     let msg_json = serde_json::to_string(&browser_connected_msg).unwrap();
     tracing::info!(code = %code, "Sending BrowserConnected to mac-client: {}", msg_json);
-    state.send_text_to_mac_client(&code, &msg_json).await;
+    session.send_text_to_mac_client(&msg_json).await;
 
     // Spawn task to forward messages to browser
     let code_clone = code.clone();
@@ -261,7 +272,7 @@ async fn handle_browser(
         match msg_result {
             Ok(Message::Binary(data)) => {
                 // Forward keyboard input to mac-client
-                state.send_to_mac_client(&code_clone, data.to_vec()).await;
+                session.send_to_mac_client(data.to_vec()).await;
             }
             Ok(Message::Text(text)) => {
                 // Handle control messages from browser
@@ -276,10 +287,10 @@ async fn handle_browser(
                             frame.push(session_id.len() as u8);
                             frame.extend_from_slice(session_id.as_bytes());
                             frame.extend_from_slice(payload);
-                            state.send_to_mac_client(&code_clone, frame).await;
+                            session.send_to_mac_client(frame).await;
                         }
                         ControlMessage::CreateSession => {
-                            state.send_text_to_mac_client(&code_clone, &text).await;
+                            session.send_text_to_mac_client(&text).await;
                         }
                         _ => {}
                     }
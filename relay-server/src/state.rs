@@ -1,4 +1,5 @@
 use dashmap::DashMap;
+use std::collections::{HashMap, VecDeque};
 use std::sync::Arc;
 use tokio::sync::{mpsc, Mutex};
 
@@ -28,10 +29,70 @@ pub struct Session {
     /// Connected browsers: browser_id -> sender channel
     pub browsers: DashMap<String, mpsc::Sender<BrowserMessage>>,
     /// Accumulated terminal output frames for replay on browser reconnect.
-    /// Each entry is a complete binary frame (with session ID prefix).
-    scrollback_frames: Mutex<Vec<Vec<u8>>>,
-    /// Total byte count of all frames in scrollback (for cap enforcement).
-    scrollback_bytes: Mutex<usize>,
+    scrollback: Mutex<Scrollback>,
+}
+
+/// Scrollback frames plus the bookkeeping needed to cap and purge them.
+#[derive(Default)]
+struct Scrollback {
+    /// Complete binary frames (with session ID prefix), oldest first.
+    frames: VecDeque<Vec<u8>>,
+    /// Total byte count of all frames (for cap enforcement).
+    bytes: usize,
+    /// Terminal session ID -> bytes held for it. Lets a purge skip sessions
+    /// with nothing buffered and avoid re-summing the remaining frames.
+    bytes_by_session: HashMap<Vec<u8>, usize>,
+}
+
+/// Terminal session ID prefix of a binary frame.
+/// Binary frame format: [1 byte session_id_len][session_id][payload]
+fn frame_session_id(frame: &[u8]) -> Option<&[u8]> {
+    let id_len = *frame.first()? as usize;
+    frame.get(1..1 + id_len)
+}
+
+impl Scrollback {
+    /// Append a frame, dropping the oldest frames while over MAX_SCROLLBACK.
+    fn push(&mut self, frame: Vec<u8>) {
+        let Some(sid) = frame_session_id(&frame) else {
+            return;
+        };
+        match self.bytes_by_session.get_mut(sid) {
+            Some(bytes) => *bytes += frame.len(),
+            None => {
+                self.bytes_by_session.insert(sid.to_vec(), frame.len());
+            }
+        }
+        self.bytes += frame.len();
+        self.frames.push_back(frame);
+
+        while self.bytes > MAX_SCROLLBACK {
+            let Some(removed) = self.frames.pop_front() else {
+                break;
+            };
+            self.bytes -= removed.len();
+            if let Some(sid) = frame_session_id(&removed) {
+                if let Some(bytes) = self.bytes_by_session.get_mut(sid) {
+                    *bytes -= removed.len();
+                    if *bytes == 0 {
+                        self.bytes_by_session.remove(sid);
+                    }
+                }
+            }
+        }
+    }
+
+    /// Remove all frames for a terminal session. Returns the number removed.
+    fn purge(&mut self, terminal_session_id: &[u8]) -> usize {
+        let Some(bytes) = self.bytes_by_session.remove(terminal_session_id) else {
+            return 0;
+        };
+        let before = self.frames.len();
+        self.frames
+            .retain(|frame| frame_session_id(frame) != Some(terminal_session_id));
+        self.bytes -= bytes;
+        before - self.frames.len()
+    }
 }
 
 /// Shared application state
@@ -41,8 +102,11 @@ pub struct AppState {
 }
 
 struct AppStateInner {
-    /// Session code -> Session data
-    sessions: DashMap<String, Session>,
+    /// Session code -> Session data.
+    /// Sessions are reference-counted so connection handlers can hold one
+    /// for their lifetime instead of looking it up (and holding a shard
+    /// lock across awaits) on every message.
+    sessions: DashMap<String, Arc<Session>>,
 }
 
 impl AppState {
@@ -67,18 +131,22 @@ impl AppState {
 
         self.inner.sessions.insert(
             code.clone(),
-            Session {
+            Arc::new(Session {
                 mac_tx,
                 browsers: DashMap::new(),
-                scrollback_frames: Mutex::new(Vec::new()),
-                scrollback_bytes: Mutex::new(0),
-            },
+                scrollback: Mutex::new(Scrollback::default()),
+            }),
         );
 
         tracing::info!(code = %code, "Mac-client registered");
         code
     }
 
+    /// Get a handle to a session, for callers that use it repeatedly
+    pub fn get_session(&self, code: &str) -> Option<Arc<Session>> {
+        self.inner.sessions.get(code).map(|s| Arc::clone(s.value()))
+    }
+
     /// Validate a session code, returns true if valid
     pub fn validate_session_code(&self, code: &str) -> bool {
         self.inner.sessions.contains_key(code)
@@ -109,100 +177,55 @@ impl AppState {
             session.browsers.remove(browser_id);
         }
     }
+}
 
-    /// Broadcast terminal output (binary) to all browsers in a session
-    pub async fn broadcast_to_browsers(&self, code: &str, data: Vec<u8>) {
-        if let Some(session) = self.inner.sessions.get(code) {
-            // Append frame to scrollback, dropping oldest frames if over cap
-            {
-                let frame_len = data.len();
-                let mut frames = session.scrollback_frames.lock().await;
-                let mut total = session.scrollback_bytes.lock().await;
-
-                frames.push(data.clone());
-                *total += frame_len;
-
-                // Drop oldest frames until we're under the cap
-                while *total > MAX_SCROLLBACK && !frames.is_empty() {
-                    let removed = frames.remove(0);
-                    *total -= removed.len();
-                }
-            }
+impl Session {
+    /// Broadcast terminal output (binary) to all browsers in this session
+    pub async fn broadcast_to_browsers(&self, data: Vec<u8>) {
+        // Append frame to scrollback, dropping oldest frames if over cap
+        self.scrollback.lock().await.push(data.clone());
 
-            for entry in session.browsers.iter() {
-                let _ = entry.value().send(BrowserMessage::Binary(data.clone())).await;
-            }
+        for entry in self.browsers.iter() {
+            let _ = entry.value().send(BrowserMessage::Binary(data.clone())).await;
         }
     }
 
-    /// Purge scrollback frames belonging to a specific terminal session.
-    /// Binary frame format: [1 byte session_id_len][session_id][payload]
-    pub async fn purge_session_scrollback(&self, code: &str, terminal_session_id: &str) {
-        if let Some(session) = self.inner.sessions.get(code) {
-            let mut frames = session.scrollback_frames.lock().await;
-            let mut total = session.scrollback_bytes.lock().await;
-
-            let tid = terminal_session_id.as_bytes();
-            let before = frames.len();
-            frames.retain(|frame| {
-                if frame.is_empty() {
-                    return false;
-                }
-                let id_len = frame[0] as usize;
-                if frame.len() < 1 + id_len {
-                    return false;
-                }
-                let frame_sid = &frame[1..1 + id_len];
-                frame_sid != tid
-            });
-            let after = frames.len();
-
-            // Recalculate total bytes
-            *total = frames.iter().map(|f| f.len()).sum();
-
-            if before != after {
-                tracing::info!(
-                    code = %code,
-                    terminal_session_id = %terminal_session_id,
-                    purged = before - after,
-                    remaining = after,
-                    "Purged scrollback frames for dead session"
-                );
-            }
+    /// Broadcast text message (JSON) to all browsers in this session
+    pub async fn broadcast_text_to_browsers(&self, text: &str) {
+        for entry in self.browsers.iter() {
+            let _ = entry.value().send(BrowserMessage::Text(text.to_string())).await;
         }
     }
 
-    /// Get scrollback frames for replay to a newly connected browser.
-    pub async fn get_scrollback(&self, code: &str) -> Vec<Vec<u8>> {
-        if let Some(session) = self.inner.sessions.get(code) {
-            let frames = session.scrollback_frames.lock().await;
-            frames.clone()
-        } else {
-            Vec::new()
-        }
+    /// Send keyboard input (binary) to this session's mac-client
+    pub async fn send_to_mac_client(&self, data: Vec<u8>) {
+        let _ = self.mac_tx.send(MacMessage::Binary(data)).await;
     }
 
-    /// Broadcast text message (JSON) to all browsers in a session
-    pub async fn broadcast_text_to_browsers(&self, code: &str, text: &str) {
-        if let Some(session) = self.inner.sessions.get(code) {
-            for entry in session.browsers.iter() {
-                let _ = entry.value().send(BrowserMessage::Text(text.to_string())).await;
-            }
-        }
+    /// Send text message (JSON) to this session's mac-client
+    pub async fn send_text_to_mac_client(&self, text: &str) {
+        let _ = self.mac_tx.send(MacMessage::Text(text.to_string())).await;
     }
 
-    /// Send keyboard input (binary) to mac-client
-    pub async fn send_to_mac_client(&self, code: &str, data: Vec<u8>) {
-        if let Some(session) = self.inner.sessions.get(code) {
-            let _ = session.mac_tx.send(MacMessage::Binary(data)).await;
+    /// Purge scrollback frames belonging to a specific terminal session.
+    pub async fn purge_scrollback(&self, terminal_session_id: &str) {
+        let mut scrollback = self.scrollback.lock().await;
+        let purged = scrollback.purge(terminal_session_id.as_bytes());
+
+        if purged > 0 {
+            tracing::info!(
+                terminal_session_id = %terminal_session_id,
+                purged = purged,
+                remaining = scrollback.frames.len(),
+                "Purged scrollback frames for dead session"
+            );
         }
     }
 
-    /// Send text message (JSON) to mac-client
-    pub async fn send_text_to_mac_client(&self, code: &str, text: &str) {
-        if let Some(session) = self.inner.sessions.get(code) {
-            let _ = session.mac_tx.send(MacMessage::Text(text.to_string())).await;
-        }
+    /// Get scrollback frames for replay to a newly connected browser.
+    pub async fn get_scrollback(&self) -> Vec<Vec<u8>> {
+        let scrollback = self.scrollback.lock().await;
+        scrollback.frames.iter().cloned().collect()
     }
 }
 
@@ -211,3 +234,41 @@ impl Default for AppState {
         Self::new()
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn frame(sid: &str, payload_len: usize) -> Vec<u8> {
+        let mut frame = vec![sid.len() as u8];
+        frame.extend_from_slice(sid.as_bytes());
+        frame.resize(frame.len() + payload_len, b'x');
+        frame
+    }
+
+    #[test]
+    fn test_scrollback_drops_oldest_over_cap() {
+        let mut scrollback = Scrollback::default();
+        scrollback.push(frame("a", MAX_SCROLLBACK / 2));
+        scrollback.push(frame("b", MAX_SCROLLBACK / 2));
+        scrollback.push(frame("b", 10));
+
+        assert_eq!(scrollback.frames.len(), 2);
+        assert!(scrollback.bytes <= MAX_SCROLLBACK);
+        assert!(!scrollback.bytes_by_session.contains_key(b"a".as_slice()));
+    }
+
+    #[test]
+    fn test_scrollback_purge() {
+        let mut scrollback = Scrollback::default();
+        scrollback.push(frame("a", 5));
+        scrollback.push(frame("b", 7));
+        scrollback.push(frame("a", 3));
+
+        assert_eq!(scrollback.purge(b"a"), 2);
+        assert_eq!(scrollback.frames.len(), 1);
+        assert_eq!(scrollback.bytes, frame("b", 7).len());
+        assert_eq!(scrollback.purge(b"a"), 0);
+        assert_eq!(scrollback.purge(b"missing"), 0);
+    }
+}
@@ -30,6 +30,9 @@ import { useConnection } from './ConnectionContext';
 const DEBUG = false;
 const log = (...args: unknown[]) => DEBUG && console.log('[TerminalContext]', ...args);
 
+// Shared decoder for the writeUtf8 fallback path (avoids one per chunk)
+const utf8Decoder = new TextDecoder();
+
 // =============================================================================
 // Context Types
 // =============================================================================
@@ -93,7 +96,7 @@ export function TerminalProvider({ children }: { children: ReactNode }) {
     if (t.writeUtf8) {
       t.writeUtf8(chunk);
     } else {
-      terminal.write(new TextDecoder().decode(chunk));
+      terminal.write(utf8Decoder.decode(chunk));
     }
   };
 
@@ -44,6 +44,9 @@ export function encodeBinaryFrame(sessionId: string, payload: Uint8Array): Uint8
 /**
  * Decode a binary frame to extract session ID and payload.
  *
+ * The payload is a view into `frame` (no copy), so it shares the
+ * frame's underlying buffer.
+ *
  * @param frame - The binary frame to decode
  * @returns Object with sessionId string and payload Uint8Array
  * @throws Error if frame is too short or malformed
@@ -64,9 +67,9 @@ export function decodeBinaryFrame(frame: Uint8Array): { sessionId: string; paylo
     throw new Error(`Frame too short: expected ${1 + sessionIdLength} bytes for header, got ${frame.length}`);
   }
 
-  const sessionIdBytes = frame.slice(1, 1 + sessionIdLength);
+  const sessionIdBytes = frame.subarray(1, 1 + sessionIdLength);
   const sessionId = textDecoder.decode(sessionIdBytes);
-  const payload = frame.slice(1 + sessionIdLength);
+  const payload = frame.subarray(1 + sessionIdLength);
 
   return { sessionId, payload };
 }